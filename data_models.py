@@ -1,63 +1,144 @@
-import json
-from typing import List
+import sys
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Dict, List
 
 from astropy import units as u
-from astropy.units import UnitBase, Quantity
-from pydantic import validator
+from astropy.units import UnitBase, Quantity, PhysicalType
 
-from pydantic_finagling import UnitfulBaseModel, density_type, mass_type, specific_volume_type, volume_type, \
-    validate_unit, validate_quantity
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+from units_helpers import density_type, mass_type, specific_volume_type, volume_type, \
+    validate_unit, validate_quantity, encode_unit, encode_quantity, per_unit_factor
 
 
 u.imperial.enable()
 
 
-class MaterialData(UnitfulBaseModel):
+@dataclass(slots=True, frozen=True)
+class MaterialData:
     """A known material with physical properties.
 
     The unit indicates the preferred unit representation for this material, and the
     mass_per_unit and volume_per_unit allow mass or volume measurements to be
     converted to the preferred unit.
+
+    The physical type of the preferred unit is computed once, when the material is
+    created, and factors from other units into the preferred unit are cached as they are
+    first needed, so they need not be worked out again for every ingredient.
+
+    Note that the material is therefore not entirely immutable: although its fields are
+    frozen, conversion_factor fills in a private cache dict as it goes. The cache is left
+    out of comparisons, and is copied along with the material when it is pickled (for
+    example to worker processes), after which each copy's cache grows separately.
     """
     name: str
     unit: UnitBase
     mass_per_unit: Quantity[density_type, mass_type] | None
     volume_per_unit: Quantity[specific_volume_type, volume_type] | None
 
-    _validate_unit = validator("unit", pre=True, always=True, allow_reuse=True)(
-        validate_unit
-    )
-    _validate_mass_per_unit = validator("mass_per_unit", pre=True, always=True, allow_reuse=True)(
-        lambda q: None if q is None else validate_quantity(q)
-    )
-    _validate_volume_per_unit = validator("volume_per_unit", pre=True, always=True, allow_reuse=True)(
-        lambda q: None if q is None else validate_quantity(q)
+    _physical_type: PhysicalType = field(init=False, repr=False, compare=False)
+    _unit_factors: Dict[UnitBase, float | None] = field(
+        init=False, repr=False, compare=False, default_factory=dict
     )
 
-
-class IngredientData(UnitfulBaseModel):
+    def __post_init__(self):
+        object.__setattr__(self, "_physical_type", self.unit.physical_type)
+
+    def conversion_factor(self, unit: UnitBase) -> float | None:
+        """Get the number of the preferred unit in one `unit` of this material.
+
+        None is returned if `unit` cannot be converted to the preferred unit, for example a
+        mass when the material has no mass_per_unit.
+        """
+        if unit in self._unit_factors:
+            return self._unit_factors[unit]
+
+        physical_type = unit.physical_type
+        if physical_type == self._physical_type:
+            factor = (1 * unit).to_value(self.unit)
+        elif physical_type is mass_type:
+            factor = per_unit_factor(unit, self.mass_per_unit, self.unit)
+        elif physical_type is volume_type:
+            factor = per_unit_factor(unit, self.volume_per_unit, self.unit)
+        else:
+            factor = None
+
+        self._unit_factors[unit] = factor
+        return factor
+
+    @classmethod
+    def parse_obj(cls, obj: Dict) -> "MaterialData":
+        mass_per_unit = obj.get("mass_per_unit")
+        volume_per_unit = obj.get("volume_per_unit")
+        return cls(
+            name=sys.intern(obj["name"]),
+            unit=validate_unit(obj["unit"]),
+            mass_per_unit=None if mass_per_unit is None else validate_quantity(mass_per_unit),
+            volume_per_unit=None if volume_per_unit is None else validate_quantity(volume_per_unit),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class IngredientData:
     """An item with a quantity and a name.
 
     The item names will be compared with the list of known materials. Although it is not
     required that a name match (feel free to use off-the-cuff ingredients), it is beneficial
     to ensure a match if you are in fact using a known material (don't just spell it wrong).
+
+    Item names are interned when loaded, as are material names, so that lookups and
+    comparisons between them are cheap.
     """
     quantity: Quantity[mass_type, volume_type, u.count]
     item: str
 
-    _validate_quantity = validator("quantity", pre=True, always=True, allow_reuse=True)(
-        validate_quantity
-    )
+    @classmethod
+    def parse_obj(cls, obj: Dict) -> "IngredientData":
+        return cls(quantity=validate_quantity(obj["quantity"]), item=sys.intern(obj["item"]))
 
 
-class RecipeData(UnitfulBaseModel):
+@dataclass(slots=True, frozen=True)
+class RecipeData:
     """A recipe with name, source, instructions, and ingredients."""
     name: str
     source: str
     ingredients: List[IngredientData]
     instructions: List[str]
 
+    @classmethod
+    def parse_obj(cls, obj: Dict) -> "RecipeData":
+        return cls(
+            name=obj["name"],
+            source=obj["source"],
+            ingredients=[IngredientData.parse_obj(ingredient) for ingredient in obj["ingredients"]],
+            instructions=list(obj["instructions"]),
+        )
+
 
 def load_list(file_name, parse_method):
-    with open(file_name) as f:
-        return [parse_method(element) for element in json.load(f)]
+    with open(file_name, "rb") as f:
+        return [parse_method(element) for element in loads(f.read())]
+
+
+def to_dict(model) -> Dict:
+    """Convert a data model into a JSON-compatible dict, in the form parse_obj reads."""
+    return {
+        model_field.name: _encode(getattr(model, model_field.name))
+        for model_field in fields(model)
+        if model_field.init
+    }
+
+
+def _encode(value):
+    if isinstance(value, Quantity):
+        return encode_quantity(value)
+    elif isinstance(value, UnitBase):
+        return encode_unit(value)
+    elif isinstance(value, list):
+        return [_encode(element) for element in value]
+    elif is_dataclass(value):
+        return to_dict(value)
+    return value
@@ -1,104 +1,149 @@
-from functools import partial, reduce
-from itertools import chain
-from typing import List, Dict, Iterable
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
+from typing import List, Dict, Iterable, Tuple
 
-from astropy import units as u
+from astropy.units import Quantity, UnitBase
 
 from data_models import MaterialData, IngredientData, RecipeData, load_list
 
 
-def regularize_ingredient(
+def regularize_quantity(
         ingredient: IngredientData,
         known_materials: Dict[str, MaterialData]
-) -> IngredientData:
+) -> Tuple[float, UnitBase]:
+    """Get the ingredient's value and unit, in its material's preferred unit if it is known."""
     material = known_materials.get(ingredient.item)
 
     if material:
-        if ingredient.quantity.unit.physical_type == material.unit.physical_type:
-            quantity = ingredient.quantity
-        elif ingredient.quantity.unit.physical_type == u.get_physical_type("mass"):
-            quantity = ingredient.quantity / material.mass_per_unit
-        elif ingredient.quantity.unit.physical_type == u.get_physical_type("volume"):
-            quantity = ingredient.quantity / material.volume_per_unit
-        else:
+        factor = material.conversion_factor(ingredient.quantity.unit)
+        if factor is None:
             raise ValueError(
                 f"Cannot regularize {ingredient.item} with {ingredient.quantity}. Preferred unit is {material.unit}"
             )
-        return IngredientData(quantity=quantity.to(material.unit), item=ingredient.item)
+        return ingredient.quantity.value * factor, material.unit
 
-    return ingredient
+    return ingredient.quantity.value, ingredient.quantity.unit
 
 
-def regularize_recipe(
+class IngredientTotal:
+    """A running total of an item, kept as a plain float in a fixed unit.
+
+    The total is only turned back into a Quantity when it is asked for, so that merging
+    ingredients is a float addition rather than Quantity arithmetic.
+    """
+    __slots__ = ("item", "value", "unit")
+
+    def __init__(self, item: str, value: float, unit: UnitBase):
+        self.item = item
+        self.value = value
+        self.unit = unit
+
+    @property
+    def quantity(self) -> Quantity:
+        return self.value * self.unit
+
+
+def add_to_totals(
+        totals: Dict[str, IngredientTotal],
+        item: str,
+        value: float,
+        unit: UnitBase
+) -> Dict[str, IngredientTotal]:
+    total = totals.get(item)
+    if total is None:
+        totals[item] = IngredientTotal(item=item, value=value, unit=unit)
+    elif unit == total.unit:
+        # Known materials are always regularized to the same unit. This also holds for
+        # totals from worker processes, whose units are equal but not identical objects.
+        total.value += value
+    else:
+        total.value += (value * unit).to_value(total.unit)
+    return totals
+
+
+def add_recipe_to_ingredients(
+        ingredients: Dict[str, IngredientTotal],
         recipe: RecipeData,
         known_materials: Dict[str, MaterialData]
-) -> RecipeData:
-    return RecipeData(
-        name=recipe.name,
-        source=recipe.source,
-        instructions=recipe.instructions,
-        ingredients=[
-            regularize_ingredient(ingredient, known_materials)
-            for ingredient in recipe.ingredients
-        ],
-    )
+) -> Dict[str, IngredientTotal]:
+    # Regularize each of the recipe's ingredients and accumulate it into the running
+    # totals in the same pass, keyed by item name, so that same-named items are merged
+    # without any sorting or intermediate recipe.
+    for ingredient in recipe.ingredients:
+        value, unit = regularize_quantity(ingredient, known_materials)
+        add_to_totals(ingredients, ingredient.item, value, unit)
+    return ingredients
 
 
-def add_recipe_to_ingredients(
-        ingredients: Iterable[IngredientData],
-        recipe: RecipeData
-) -> Iterable[IngredientData]:
-    return reduce(
-        # Compare each ingredient with the end of the list. If it is the same item, merge them.
-        # Otherwise, just add them to the list separately.
-        lambda merged_ingredients, ingredient: merged_ingredients[:-1]
-        + [
-            IngredientData(
-                item=ingredient.item,
-                quantity=ingredient.quantity + merged_ingredients[-1].quantity,
-            )
-        ]
-        if merged_ingredients and ingredient.item == merged_ingredients[-1].item
-        else merged_ingredients + [ingredient],
-
-        # Append the recipe's ingredients to the overall list of ingredients, then
-        # sort the result by item name, so that same-named items will be next to each
-        # other.
-        sorted(
-            chain(ingredients, recipe.ingredients),
-            key=lambda ingredient: ingredient.item,
-        ),
-
-        # Initialize with an empty list.
-        [],
-    )
+# The material lookup in a worker process, sent once when the worker starts rather than
+# with every recipe. It also lets each material's conversion factors stay cached between
+# recipes in the same worker.
+_worker_materials: Dict[str, MaterialData] = {}
+
+
+def _init_worker(known_materials: Dict[str, MaterialData]):
+    global _worker_materials
+    _worker_materials = known_materials
+
+
+def _total_recipe(recipe: RecipeData) -> Dict[str, IngredientTotal]:
+    return add_recipe_to_ingredients({}, recipe, _worker_materials)
+
+
+def merge_totals(
+        totals: Dict[str, IngredientTotal],
+        other_totals: Dict[str, IngredientTotal]
+) -> Dict[str, IngredientTotal]:
+    for total in other_totals.values():
+        add_to_totals(totals, total.item, total.value, total.unit)
+    return totals
 
 
 def create_grocery_list(
         recipes: Iterable[RecipeData],
-        material_definitions: List[MaterialData]
-) -> Iterable[IngredientData]:
+        material_definitions: List[MaterialData],
+        max_workers: int = 1
+) -> List[IngredientData]:
     # Turn the list of materials into a lookup table for efficient use.
     material_lookup = {material.name: material for material in material_definitions}
 
-    # Merge each recipe into the list of ingredients.
-    return reduce(
-        # Apply the function defined above.
-        add_recipe_to_ingredients,
-
-        # Apply the regularization to all the recipes before they go through.
-        map(partial(regularize_recipe, known_materials=material_lookup), recipes),
-
-        # Initialize with an empty iterator.
-        iter(()),
+    # Merge each recipe into the totals for each item.
+    totals = {}
+    if max_workers > 1:
+        # Each recipe is totalled independently in a worker process, handed out in batches,
+        # and the results are merged in the order the recipes were given.
+        recipes = list(recipes)
+        with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(material_lookup,)
+        ) as executor:
+            for recipe_totals in executor.map(
+                    _total_recipe,
+                    recipes,
+                    chunksize=max(1, len(recipes) // (4 * max_workers))
+            ):
+                merge_totals(totals, recipe_totals)
+    else:
+        for recipe in recipes:
+            add_recipe_to_ingredients(totals, recipe, material_lookup)
+
+    # Only build the final ingredients once all the totals are known, sorted by item name
+    # so the list comes out in a reproducible order.
+    return sorted(
+        (IngredientData(quantity=total.quantity, item=total.item) for total in totals.values()),
+        key=attrgetter("item"),
     )
 
 
 def main():
     material_definitions = load_list("materials.json", MaterialData.parse_obj)
     recipes = load_list("recipes.json", RecipeData.parse_obj)
-    for grocery_item in create_grocery_list(recipes, material_definitions):
-        print(f"- {grocery_item.quantity:.2} {grocery_item.item}")
+    sys.stdout.write("".join(
+        f"- {grocery_item.quantity:.2} {grocery_item.item}\n"
+        for grocery_item in create_grocery_list(recipes, material_definitions)
+    ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import sys
+from operator import attrgetter
+from typing import List, Dict, Iterable
+
+import numpy as np
+from astropy.units import UnitBase
+from numba import njit
+
+from data_models import MaterialData, IngredientData, RecipeData, load_list
+from functional import regularize_quantity
+
+
+@njit(cache=True)
+def group_sum(idx, val, out):
+    for i in range(idx.size):
+        out[idx[i]] += val[i]
+    return out
+
+
+def create_grocery_list(
+        recipes: Iterable[RecipeData],
+        material_definitions: List[MaterialData]
+) -> List[IngredientData]:
+    # Turn the list of materials into a lookup table for efficient use.
+    material_lookup = {material.name: material for material in material_definitions}
+
+    # Give each item a slot, and remember the unit its total is kept in. Known materials
+    # are regularized to their preferred unit; unknown items keep the first unit seen.
+    item_index: Dict[str, int] = {}
+    item_units: List[UnitBase] = []
+    idx = []
+    val = []
+    for recipe in recipes:
+        for ingredient in recipe.ingredients:
+            value, unit = regularize_quantity(ingredient, material_lookup)
+            slot = item_index.get(ingredient.item)
+            if slot is None:
+                slot = item_index[ingredient.item] = len(item_units)
+                item_units.append(unit)
+            idx.append(slot)
+            val.append(value if unit == item_units[slot] else (value * unit).to_value(item_units[slot]))
+
+    # Sum the values for each item in compiled code.
+    totals = group_sum(
+        np.array(idx, dtype=np.int32),
+        np.array(val, dtype=np.float64),
+        np.zeros(len(item_units)),
+    )
+
+    return sorted(
+        (
+            IngredientData(quantity=totals[slot] * item_units[slot], item=item)
+            for item, slot in item_index.items()
+        ),
+        key=attrgetter("item"),
+    )
+
+
+def main():
+    material_definitions = load_list("materials.json", MaterialData.parse_obj)
+    recipes = load_list("recipes.json", RecipeData.parse_obj)
+    sys.stdout.write("".join(
+        f"- {grocery_item.quantity:.2} {grocery_item.item}\n"
+        for grocery_item in create_grocery_list(recipes, material_definitions)
+    ))
+
+
+if __name__ == "__main__":
+    main()
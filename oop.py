@@ -1,8 +1,14 @@
-from typing import List, Iterable
+import sys
+from typing import Dict, List, Iterable, Tuple
+
+import numpy as np
 from astropy import units as u
 
 from data_models import MaterialData, IngredientData, load_list, RecipeData
 
+# Factors for converting between pairs of units, shared by all materials.
+_conversion_cache: Dict[Tuple[u.UnitBase, u.UnitBase], float] = {}
+
 
 class Material:
     def __init__(
@@ -29,29 +35,43 @@ class Material:
             raise ValueError(f"Cannot regularize {quantity} as {self}.")
 
     def regularize_unit(self, quantity):
-        return quantity.to(self.unit)
+        key = (quantity.unit, self.unit)
+        factor = _conversion_cache.get(key)
+        if factor is None:
+            factor = _conversion_cache[key] = (1 * quantity.unit).to_value(self.unit)
+        return (quantity.value * factor) * self.unit
 
 
 class MaterialDefinitions:
     def __init__(self, material_list: Iterable[Material]):
-        self._material_lookup = {material.name: material for material in material_list}
+        # The known materials do not change once loaded. Materials created for unknown
+        # ingredients are kept separately, so the known lookup is never mutated.
+        self._material_lookup = {sys.intern(material.name): material for material in material_list}
+        self._unknown_lookup = {}
 
     @classmethod
     def from_file(cls, filename):
         material_data_list = (
-            Material(**material_data.dict())
+            Material(
+                name=material_data.name,
+                unit=material_data.unit,
+                mass_per_unit=material_data.mass_per_unit,
+                volume_per_unit=material_data.volume_per_unit,
+            )
             for material_data in load_list(filename, MaterialData.parse_obj)
         )
         return cls(material_list=material_data_list)
 
     def load_ingredient(self, ingredient_data: IngredientData) -> "Ingredient":
-        material = self._material_lookup.get(ingredient_data.item)
+        material = self._material_lookup.get(ingredient_data.item) or self._unknown_lookup.get(
+            ingredient_data.item
+        )
 
         if material:
             return Ingredient(quantity=ingredient_data.quantity, material=material)
 
         new_material = Material(name=ingredient_data.item, unit=ingredient_data.quantity.unit)
-        self._material_lookup[new_material.name] = new_material
+        self._unknown_lookup[new_material.name] = new_material
 
         return Ingredient(quantity=ingredient_data.quantity, material=new_material)
 
@@ -116,19 +136,39 @@ class RecipePlanner:
 
     def get_shopping_list(self) -> List[Ingredient]:
         if not self._shopping_cart:
+            # Every ingredient is already in its material's unit, so the totals can be
+            # summed as plain floats, one slot per material.
+            materials: List[Material] = []
+            material_index: Dict[str, int] = {}
+            indices = []
+            values = []
             for recipe in self.recipes:
                 for ingredient in recipe.ingredients:
-                    if ingredient.material.name not in self._shopping_cart:
-                        self._shopping_cart[ingredient.material.name] = Ingredient(
-                            quantity=0*ingredient.material.unit,
-                            material=ingredient.material
-                        )
-                    self._shopping_cart[ingredient.material.name].quantity += ingredient.quantity
+                    index = material_index.get(ingredient.material.name)
+                    if index is None:
+                        index = material_index[ingredient.material.name] = len(materials)
+                        materials.append(ingredient.material)
+                    indices.append(index)
+                    values.append(ingredient.quantity.value)
+
+            totals = np.bincount(
+                np.array(indices, dtype=np.intp),
+                weights=np.array(values, dtype=np.float64),
+                minlength=len(materials),
+            )
+
+            for material, total in zip(materials, totals):
+                self._shopping_cart[material.name] = Ingredient(
+                    quantity=total * material.unit,
+                    material=material
+                )
         return list(self._shopping_cart.values())
 
     def print_grocery_list(self):
-        for grocery_item in self.get_shopping_list():
-            print(f"- {grocery_item.quantity:.2} {grocery_item.material.name}")
+        sys.stdout.write("".join(
+            f"- {grocery_item.quantity:.2} {grocery_item.material.name}\n"
+            for grocery_item in self.get_shopping_list()
+        ))
 
 
 if __name__ == "__main__":
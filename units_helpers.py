@@ -0,0 +1,72 @@
+from functools import lru_cache
+from typing import Dict
+
+from astropy.units import get_physical_type, UnitBase, Unit, Quantity, UnitConversionError
+
+# Density: for example "g/mL" or "lb/gallon"
+density_type = get_physical_type("mass density")
+
+# Specific Volume: for example "cups/ounce" or "L/kg". The inverse of mass density.
+specific_volume_type = get_physical_type("specific volume")
+
+# Mass: for example "g", "lb", "ounce"
+mass_type = get_physical_type("mass")
+
+# Volume: for example "L" or "cup".
+volume_type = get_physical_type("volume")
+
+
+@lru_cache(maxsize=None)
+def _unit(unit: str) -> UnitBase:
+    # Data files reuse a handful of unit strings, so only parse each one once.
+    return Unit(unit)
+
+
+def validate_unit(unit: UnitBase | str) -> UnitBase:
+    if type(unit) is str or isinstance(unit, str):
+        return _unit(unit)
+    elif isinstance(unit, UnitBase):
+        return unit
+    else:
+        raise ValueError(f'Invalid type for unit: "{type(unit)}".')
+
+
+def validate_quantity(quantity: Quantity | Dict) -> Quantity:
+    quantity_type = type(quantity)
+    if quantity_type is dict or isinstance(quantity, dict):
+        try:
+            return float(quantity["value"]) * _unit(quantity["unit"])
+        except KeyError:
+            raise ValueError(
+                f'Could not parts quantity dict: "{quantity}". Expected something of the form "{{"value": <value>, "unit": <unit>}}"'
+            )
+    elif quantity_type is Quantity or isinstance(quantity, Quantity):
+        return quantity
+    else:
+        raise ValueError(f'Invalid type for quantity: "{type(quantity)}".')
+
+
+def encode_unit(unit: UnitBase) -> str:
+    return unit.to_string()
+
+
+def encode_quantity(quantity: Quantity) -> Dict:
+    return {"value": float(quantity.value), "unit": quantity.unit.to_string()}
+
+
+def per_unit_factor(
+        from_unit: UnitBase,
+        amount_per_unit: Quantity | None,
+        to_unit: UnitBase
+) -> float | None:
+    """Get the number of `to_unit` in one `from_unit`, given the amount per `to_unit`.
+
+    None is returned if there is no amount per unit, or if it does not relate the two units.
+    """
+    if amount_per_unit is None:
+        return None
+    try:
+        return (1 * from_unit / amount_per_unit).to_value(to_unit)
+    except UnitConversionError:
+        return None
+